@@ -1,3 +1,4 @@
+import sys
 import tsconj
 from sys import argv
 
@@ -6,11 +7,16 @@ max_solutions = int(argv[2])
 model_path = argv[3]
 
 spaces = tsconj.compute_trap_spaces(
-	model_path, 
-	max_output=max_solutions, 
-	method="conj", 
+	model_path,
+	max_output=max_solutions,
+	method="conj",
 	computation=problem
 )
 
+# Iterate lazily and write through the buffered binary stream; print() would
+# re-encode and lock stdout for every line.
+out = sys.stdout.buffer
 for space in spaces:
-	print("".join(space))
\ No newline at end of file
+	out.write("".join(space).encode())
+	out.write(b"\n")
+out.flush()
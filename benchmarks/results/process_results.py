@@ -3,194 +3,216 @@
 Process benchmark result tables and generate summary statistics.
 
 Usage:
-    python process_results.py <results_folder> <exclude_file> [output_file]
+    python process_results.py <results_folder> <exclude_file> [output_file] [--use-cache]
 
 Arguments:
     results_folder: Path to folder containing CSV result tables
     exclude_file: Path to file containing instance names to exclude (one per line)
     output_file: Optional path for output summary CSV (default: summary.csv)
+    --use-cache: Cache parsed tables as .feather files next to the CSVs and
+                 reload them on later runs when still up to date
 """
 
+import re
 import sys
 import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Common extensions to remove so instances match across different formats
+_SUFFIX_RE = re.compile(r'\.normal\.(?:adf|sbml|bnet)$')
+
+# Optional per-table columns, in output order
+_OPTIONAL_COLS = ('Status', 'Runtime_sec', 'Memory_KB')
+
 
 def load_exclude_list(exclude_file):
-    """Load the list of instances to exclude."""
-    with open(exclude_file, 'r') as f:
-        exclude_set = {line.strip() for line in f if line.strip()}
-    return exclude_set
+    """Load the list of instances to exclude, pre-normalized."""
+    text = Path(exclude_file).read_text()
+    return frozenset(
+        normalize_instance_name(line.strip())
+        for line in text.splitlines()
+        if line.strip()
+    )
+
+
+def load_result_tables(results_folder, use_cache=False):
+    """Load all CSV files from the results folder.
 
+    Returns the tables together with a per-table schema recording which
+    optional columns are present, so downstream loops don't re-check
+    df.columns per table.
 
-def load_result_tables(results_folder):
-    """Load all CSV files from the results folder."""
+    With use_cache, each parsed table is mirrored as a .feather file next
+    to its CSV and reloaded from there on later runs while the cache is at
+    least as new as the CSV, skipping the parse entirely.
+    """
     folder_path = Path(results_folder)
-    csv_files = list(folder_path.glob('*.csv'))
-    
+    csv_files = [path for path in folder_path.iterdir() if path.suffix == '.csv']
+
     if not csv_files:
         raise ValueError(f"No CSV files found in {results_folder}")
-    
+
+    # Each file yields an independent frame, so parsing is trivially
+    # parallel; the parsers release the GIL, overlapping I/O and decode
+    with ThreadPoolExecutor() as executor:
+        frames = list(executor.map(lambda f: _load_table(f, use_cache), csv_files))
+
     tables = {}
-    for csv_file in csv_files:
+    schemas = {}
+    for csv_file, df in zip(csv_files, frames):
         # Use filename without extension as the table name
         table_name = csv_file.stem
-        df = pd.read_csv(csv_file)
-        
-        # Sort by first column (Instance)
-        first_col = df.columns[0]
-        df = df.sort_values(by=first_col).reset_index(drop=True)
-        
         tables[table_name] = df
-    
-    return tables
+        schemas[table_name] = tuple(col for col in _OPTIONAL_COLS if col in df.columns)
+
+    return tables, schemas
+
+
+def _load_table(csv_file, use_cache):
+    """Load a single result table, via the feather cache if allowed."""
+    cache_file = csv_file.with_suffix('.feather')
+    if use_cache and cache_file.exists() \
+            and cache_file.stat().st_mtime >= csv_file.stat().st_mtime:
+        return pd.read_feather(cache_file)
+
+    # The multithreaded PyArrow reader parses columns in parallel;
+    # no sort here -- process_tables orders rows after filtering
+    df = pd.read_csv(csv_file, engine='pyarrow')
+    if use_cache:
+        df.to_feather(cache_file)
+    return df
 
 
 def normalize_instance_name(instance_name):
     """Normalize instance name by removing .normal.adf or .normal.sbml extension."""
-    # Remove common extensions to match instances across different formats
-    for ext in ['.normal.adf', '.normal.sbml', '.normal.bnet']:
-        if instance_name.endswith(ext):
-            return instance_name[:-len(ext)]
-    return instance_name
+    return _SUFFIX_RE.sub('', instance_name)
 
 
 def process_tables(tables, exclude_set):
-    """Process tables: remove excluded rows and ensure same rows."""
+    """Process tables: remove excluded rows and ensure same rows.
+
+    The exclude set is expected to hold already-normalized names (see
+    load_exclude_list).
+    """
     # Get the instance column name (first column)
     instance_col = None
     processed_tables = {}
-    
-    # Normalize exclude set
-    normalized_exclude_set = {normalize_instance_name(inst) for inst in exclude_set}
-    
+
     for table_name, df in tables.items():
         instance_col = df.columns[0]
         
-        # Create normalized instance column for matching
-        df = df.copy()
-        df['_normalized_instance'] = df[instance_col].apply(normalize_instance_name)
-        
-        # Remove excluded instances (using normalized names)
-        df_filtered = df[~df['_normalized_instance'].isin(normalized_exclude_set)].copy()
-        
-        # Sort by normalized instance
-        df_filtered = df_filtered.sort_values(by='_normalized_instance').reset_index(drop=True)
-        
+        # Create normalized instance column for matching; normalize each unique
+        # name once and map the result back instead of calling per cell.
+        # Copy-on-write makes the explicit .copy() calls unnecessary: assign
+        # and boolean indexing already yield independent frames.
+        mapping = {name: normalize_instance_name(name) for name in df[instance_col].unique()}
+        df = df.assign(_normalized_instance=df[instance_col].map(mapping))
+
+        # Remove excluded instances (using normalized names); sorting waits
+        # until after the common-instance filter below
+        df_filtered = df.loc[~df['_normalized_instance'].isin(exclude_set)]
+
         processed_tables[table_name] = df_filtered
     
     # Find common normalized instances across all tables
     if not processed_tables:
         raise ValueError("No tables to process")
-    
-    common_normalized_instances = set(processed_tables[list(processed_tables.keys())[0]]['_normalized_instance'])
+
+    # Share one categories index across all tables so joins and intersections
+    # work on integer category codes instead of Python strings. Index.union
+    # runs on pandas' internal hashtable, avoiding per-element Python sets.
+    all_names = pd.Index([], dtype=object)
     for df in processed_tables.values():
-        common_normalized_instances &= set(df['_normalized_instance'])
-    
-    # Filter all tables to only include common normalized instances
+        all_names = all_names.union(pd.Index(df['_normalized_instance'].unique()))
+    all_names = all_names.sort_values()
+    for table_name, df in processed_tables.items():
+        df['_normalized_instance'] = pd.Categorical(df['_normalized_instance'], categories=all_names)
+
+    # Common instances are the categories present in every table
+    presence = np.zeros(len(all_names), dtype=np.int64)
+    for df in processed_tables.values():
+        codes = np.bincount(df['_normalized_instance'].cat.codes, minlength=len(all_names))
+        presence += (codes > 0)
+    common_codes = np.flatnonzero(presence == len(processed_tables))
+
+    # Filter all tables to only include common normalized instances,
+    # matching on integer category codes rather than strings. Keep the
+    # normalized instance as the index so downstream lookups and the
+    # concat-based join align on it directly.
     for table_name in processed_tables:
-        processed_tables[table_name] = processed_tables[table_name][
-            processed_tables[table_name]['_normalized_instance'].isin(common_normalized_instances)
-        ].sort_values(by='_normalized_instance').reset_index(drop=True)
+        df = processed_tables[table_name]
+        mask = np.isin(df['_normalized_instance'].cat.codes, common_codes)
+        processed_tables[table_name] = (
+            df[mask]
+            .sort_values(by='_normalized_instance')
+            .set_index('_normalized_instance', drop=False)
+        )
     
     return processed_tables, instance_col
 
 
-def join_tables(tables, instance_col):
+def join_tables(tables, instance_col, schemas):
     """Join all tables together with renamed columns."""
-    # Start with the first table's normalized instance column
+    # Start with the first table's instance column; the tables are already
+    # indexed by normalized instance
     first_table = tables[list(tables.keys())[0]]
-    result = pd.DataFrame({
-        instance_col: first_table[instance_col],
-        '_normalized_instance': first_table['_normalized_instance']
-    })
-    
+    pieces = [first_table[[instance_col]]]
+
     # For each table, add Status, Runtime_sec, and Memory_KB columns with table name prefix
     for table_name, df in tables.items():
-        # Check which columns exist
-        status_col = 'Status' if 'Status' in df.columns else None
-        runtime_col = 'Runtime_sec' if 'Runtime_sec' in df.columns else None
-        memory_col = 'Memory_KB' if 'Memory_KB' in df.columns else None
-        
-        # Merge on normalized instance column
-        merge_cols = ['_normalized_instance']
-        if status_col:
-            merge_cols.append(status_col)
-        if runtime_col:
-            merge_cols.append(runtime_col)
-        if memory_col:
-            merge_cols.append(memory_col)
-        
-        df_to_merge = df[merge_cols].copy()
-        
-        # Rename columns
-        rename_dict = {}
-        if status_col:
-            rename_dict[status_col] = f'{table_name}_Status'
-        if runtime_col:
-            rename_dict[runtime_col] = f'{table_name}_Runtime_sec'
-        if memory_col:
-            rename_dict[memory_col] = f'{table_name}_Memory_KB'
-        
-        df_to_merge = df_to_merge.rename(columns=rename_dict)
-        
-        result = result.merge(df_to_merge, on='_normalized_instance', how='inner')
-    
-    # Drop the normalized instance column before returning
-    result = result.drop(columns=['_normalized_instance'])
-    
-    return result
+        merge_cols = list(schemas[table_name])
+        rename_dict = {col: f'{table_name}_{col}' for col in merge_cols}
+
+        pieces.append(df[merge_cols].rename(columns=rename_dict))
+
+    # A single index-aligned concat replaces the chain of pairwise merges
+    result = pd.concat(pieces, axis=1, join='inner')
+
+    return result.reset_index(drop=True)
 
 
-def compute_statistics(tables, instance_col):
+def compute_statistics(tables, instance_col, schemas):
     """Compute statistics for each table."""
     stats = {}
-    
+
+    # Build a wide boolean matrix of OK statuses indexed by normalized instance
+    # (one column per table), so per-table counts become vectorized column ops.
+    ok_matrix = pd.DataFrame({
+        name: df['Status'].eq('OK')
+        for name, df in tables.items()
+        if 'Status' in schemas[name]
+    }).fillna(False).astype(bool)
+    row_ok_total = ok_matrix.sum(axis=1)
+
     for table_name, df in tables.items():
-        status_col = 'Status' if 'Status' in df.columns else None
-        runtime_col = 'Runtime_sec' if 'Runtime_sec' in df.columns else None
-        
-        if not status_col:
+        schema = schemas[table_name]
+
+        if 'Status' not in schema:
             stats[table_name] = {
                 'ok_count': 0,
                 'unique_ok_count': 0,
                 'penalised_avg_runtime': 0.0
             }
             continue
-        
+
         # Count OK statuses
-        ok_count = (df[status_col] == 'OK').sum()
-        
+        ok_count = int(ok_matrix[table_name].sum())
+
         # Count instances that are OK only in this table
-        unique_ok_count = 0
-        for idx, row in df.iterrows():
-            normalized_instance = row['_normalized_instance']
-            if row[status_col] == 'OK':
-                # Check if all other tables have non-OK status for this normalized instance
-                is_unique = True
-                for other_name, other_df in tables.items():
-                    if other_name == table_name:
-                        continue
-                    other_status_col = 'Status' if 'Status' in other_df.columns else None
-                    if other_status_col:
-                        other_row = other_df[other_df['_normalized_instance'] == normalized_instance]
-                        if not other_row.empty and other_row.iloc[0][other_status_col] == 'OK':
-                            is_unique = False
-                            break
-                if is_unique:
-                    unique_ok_count += 1
-        
+        unique_ok_count = int(((row_ok_total == 1) & ok_matrix[table_name]).sum())
+
         # Compute penalised average runtime
-        if runtime_col:
+        if 'Runtime_sec' in schema:
             time_limit = 1200.0
-            penalised_runtimes = []
-            for idx, row in df.iterrows():
-                if row[status_col] == 'OK':
-                    penalised_runtimes.append(row[runtime_col])
-                else:
-                    penalised_runtimes.append(2 * time_limit)
-            penalised_avg_runtime = sum(penalised_runtimes) / len(penalised_runtimes) if penalised_runtimes else 0.0
+            status = df['Status'].to_numpy()
+            runtime = df['Runtime_sec'].to_numpy(dtype=np.float64)
+            penalised = np.where(status == 'OK', runtime, 2 * time_limit)
+            penalised_avg_runtime = float(penalised.mean()) if len(penalised) else 0.0
         else:
             penalised_avg_runtime = 0.0
         
@@ -204,13 +226,16 @@ def compute_statistics(tables, instance_col):
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python process_results.py <results_folder> <exclude_file> [output_file]")
+    use_cache = '--use-cache' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--use-cache']
+
+    if len(args) < 2:
+        print("Usage: python process_results.py <results_folder> <exclude_file> [output_file] [--use-cache]")
         sys.exit(1)
-    
-    results_folder = sys.argv[1]
-    exclude_file = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else 'summary.csv'
+
+    results_folder = args[0]
+    exclude_file = args[1]
+    output_file = args[2] if len(args) > 2 else 'summary.csv'
     
     # Load exclude list
     print(f"Loading exclude list from {exclude_file}...")
@@ -219,7 +244,7 @@ def main():
     
     # Load result tables
     print(f"\nLoading result tables from {results_folder}...")
-    tables = load_result_tables(results_folder)
+    tables, schemas = load_result_tables(results_folder, use_cache=use_cache)
     print(f"  Found {len(tables)} result tables: {', '.join(tables.keys())}")
     
     # Process tables
@@ -235,17 +260,22 @@ def main():
     
     # Join tables
     print("\nJoining tables...")
-    joined_df = join_tables(processed_tables, instance_col)
+    joined_df = join_tables(processed_tables, instance_col, schemas)
     print(f"  Joined table has {len(joined_df)} rows and {len(joined_df.columns)} columns")
     
     # Save summary CSV
     print(f"\nSaving summary to {output_file}...")
-    joined_df.to_csv(output_file, index=False)
+    # Arrow's columnar, multithreaded writer is much faster than to_csv
+    pacsv.write_csv(
+        pa.Table.from_pandas(joined_df, preserve_index=False),
+        output_file,
+        pacsv.WriteOptions(quoting_style='needed'),
+    )
     print(f"  Summary saved successfully")
     
     # Compute statistics
     print("\nComputing statistics...")
-    stats = compute_statistics(processed_tables, instance_col)
+    stats = compute_statistics(processed_tables, instance_col, schemas)
     
     # Print statistics
     print("\n" + "="*80)